@@ -9,27 +9,35 @@ Usage:
     python claude_notification.py --event stop
     python claude_notification.py --event tool_complete --tool-name "Bash"
     python claude_notification.py --event permission --highlight-mode focus
+
+The notification runs in a detached background process so the calling hook
+returns immediately; pass --detach to run it in the current process.
 """
 
 import argparse
 import json
 import logging
 import os
+import re
+import subprocess
 import sys
 import threading
 import time
+from array import array
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, Dict, List, Tuple
 
 # Configure logging
 script_dir = Path(__file__).parent
 log_file = script_dir.parent / "notification_debug.log"
 
 # Add file handler to see what happens during hook calls
+# Only warnings are written unless CLAUDE_NOTIFICATION_DEBUG is set
+debug_logging = bool(os.environ.get("CLAUDE_NOTIFICATION_DEBUG"))
 file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
+file_handler.setLevel(logging.DEBUG if debug_logging else logging.WARNING)
 file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
 
 logging.basicConfig(
@@ -39,6 +47,112 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 logger.addHandler(file_handler)
+if debug_logging:
+    logger.setLevel(logging.DEBUG)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        description='Claude Code Notification System',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --event stop
+  %(prog)s --event tool_complete --tool-name "Bash"
+  %(prog)s --event permission --highlight-mode focus
+  %(prog)s --event stop --highlight-mode all --flash-count 5
+        """
+    )
+
+    parser.add_argument('--event', required=True,
+                        choices=['stop', 'tool_complete', 'permission', 'error'],
+                        help='Event type triggering the notification')
+    parser.add_argument('--tool-name', default='',
+                        help='Name of the tool (for tool_complete event)')
+    parser.add_argument('--workdir',
+                        help='Working directory for window matching')
+    parser.add_argument('--highlight-mode', default='flash',
+                        choices=['flash', 'topmost', 'focus', 'all'],
+                        help='Window highlight mode')
+    parser.add_argument('--flash-count', type=int, default=5,
+                        help='Number of flash iterations (default: 5)')
+    parser.add_argument('--sound',
+                        help='Custom sound file path')
+    parser.add_argument('--no-sound', action='store_true',
+                        help='Disable sound for this notification')
+    parser.add_argument('--no-highlight', action='store_true',
+                        help='Disable window highlight for this notification')
+    parser.add_argument('--detach', action='store_true',
+                        help='Run the notification in this process '
+                             '(set on the background child spawned by the hook)')
+    parser.add_argument('--hwnd', type=int,
+                        help='Console window of the calling terminal (passed to the background child)')
+    parser.add_argument('--parent-pid', type=int,
+                        help='Process whose ancestors own the terminal window (passed to the background child)')
+
+    return parser
+
+
+def _titled_console_window() -> Optional[int]:
+    """Return this process's console window if it is a visible, titled one"""
+    if sys.platform != 'win32':
+        return None
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+        get_console_window = ctypes.WinDLL("kernel32").GetConsoleWindow
+        get_console_window.restype = wintypes.HWND
+        get_text_length = ctypes.WinDLL("user32").GetWindowTextLengthW
+        get_text_length.argtypes = [wintypes.HWND]
+        hwnd = get_console_window()
+        # Hook processes get a hidden, untitled console; only a titled one is the terminal
+        if hwnd and get_text_length(hwnd) > 0:
+            return hwnd
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Could not get console window: {e}")
+    return None
+
+
+def spawn_detached(argv: List[str]) -> bool:
+    """Re-run this script with --detach in a background process"""
+    # The child has no console and outlives this process, so pass on what
+    # only this process can still see: its titled console window and parent
+    command = [sys.executable, os.path.abspath(__file__), '--detach', *argv,
+               '--parent-pid', str(os.getppid())]
+    console_hwnd = _titled_console_window()
+    if console_hwnd:
+        command += ['--hwnd', str(console_hwnd)]
+    kwargs = {}
+    if sys.platform == 'win32':
+        # subprocess.DETACHED_PROCESS is only defined from Python 3.7
+        detached_process = getattr(subprocess, 'DETACHED_PROCESS', 0x00000008)
+        kwargs['creationflags'] = detached_process | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+
+    try:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+        return True
+    except OSError as e:
+        logger.warning(f"Failed to start background notification, running inline: {e}")
+        return False
+
+
+# Parse arguments and hand hook calls to a background process before the
+# Windows and audio imports below run, so the hook returns immediately
+if __name__ == "__main__":
+    _ARGS = build_parser().parse_args()
+    if not _ARGS.detach and spawn_detached(sys.argv[1:]):
+        sys.exit(0)
 
 
 class HighlightMode(Enum):
@@ -60,6 +174,10 @@ class NotificationConfig:
     sound_path: Optional[str] = None
 
 
+# Parsed config files keyed by (path, mtime_ns)
+_CONFIG_CACHE: Dict[Tuple[str, int], dict] = {}
+
+
 class ConfigManager:
     """Manage notification configuration from JSON file"""
 
@@ -84,14 +202,25 @@ class ConfigManager:
             }
         }
 
-        if self.config_path.exists():
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Failed to load config: {e}, using defaults")
-                return default_config
-        return default_config
+        try:
+            stat = self.config_path.stat()
+        except OSError:
+            return default_config
+
+        # Reuse the parsed config while the file is unchanged
+        cache_key = (str(self.config_path), stat.st_mtime_ns)
+        cached = _CONFIG_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            config = json.loads(self.config_path.read_bytes())
+        except (ValueError, OSError) as e:
+            logger.warning(f"Failed to load config: {e}, using defaults")
+            return default_config
+
+        _CONFIG_CACHE[cache_key] = config
+        return config
 
     def get_event_config(self, event_type: str) -> NotificationConfig:
         """Get configuration for specific event type"""
@@ -121,29 +250,127 @@ try:
     import win32con
     import win32process
     import psutil
-    # Use pygame for more reliable audio playback
+    # Prefer sounddevice: blocking stream writes run inside PortAudio, not Python
     try:
-        import pygame
-        pygame.mixer.init()
-        USE_PYGAME = True
-    except ImportError:
+        import sounddevice as sd
+        import soundfile as sf
+        if "MP3" not in sf.available_formats():
+            raise ImportError("libsndfile was built without MP3 support")
+        USE_SOUNDDEVICE = True
+    except (ImportError, OSError):
+        USE_SOUNDDEVICE = False
+    if USE_SOUNDDEVICE:
         USE_PYGAME = False
-        # Fallback to playsound
+        playsound = None
+    else:
+        # Use pygame for more reliable audio playback
         try:
-            from playsound3 import playsound
+            import pygame
+            # Larger buffer avoids underruns; the added latency is imperceptible for notifications
+            pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
+            pygame.mixer.init()
+            USE_PYGAME = True
         except ImportError:
+            USE_PYGAME = False
+            # Fallback to playsound
             try:
-                from playsound import playsound
+                from playsound3 import playsound
             except ImportError:
-                playsound = None
+                try:
+                    from playsound import playsound
+                except ImportError:
+                    playsound = None
     WINDOWS_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"Windows dependencies not available: {e}")
-    logger.warning("Run: pip install pywin32 pygame psutil")
+    logger.warning("Run: pip install pywin32 sounddevice soundfile psutil")
     WINDOWS_AVAILABLE = False
+    USE_SOUNDDEVICE = False
     USE_PYGAME = False
     playsound = None
 
+if WINDOWS_AVAILABLE:
+    import ctypes
+    from ctypes import wintypes
+
+    class FLASHWINFO(ctypes.Structure):
+        _fields_ = [
+            ("cbSize", wintypes.UINT),
+            ("hwnd", wintypes.HWND),
+            ("dwFlags", wintypes.DWORD),
+            ("uCount", wintypes.UINT),
+            ("dwTimeout", wintypes.DWORD),
+        ]
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_void_p),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", wintypes.LONG),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", wintypes.WCHAR * wintypes.MAX_PATH),
+        ]
+
+    TH32CS_SNAPPROCESS = 0x00000002
+    INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    # Bind Win32 functions once with explicit signatures; private WinDLL
+    # instances keep these argtypes from leaking into other ctypes users
+    _user32 = ctypes.WinDLL("user32")
+    _kernel32 = ctypes.WinDLL("kernel32")
+
+    _FlashWindowEx = _user32.FlashWindowEx
+    _FlashWindowEx.argtypes = [ctypes.POINTER(FLASHWINFO)]
+    _FlashWindowEx.restype = wintypes.BOOL
+
+    _GetConsoleWindow = _kernel32.GetConsoleWindow
+    _GetConsoleWindow.argtypes = []
+    _GetConsoleWindow.restype = wintypes.HWND
+
+    _CreateToolhelp32Snapshot = _kernel32.CreateToolhelp32Snapshot
+    _CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+    _CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+
+    _Process32FirstW = _kernel32.Process32FirstW
+    _Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    _Process32FirstW.restype = wintypes.BOOL
+
+    _Process32NextW = _kernel32.Process32NextW
+    _Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    _Process32NextW.restype = wintypes.BOOL
+
+    _CloseHandle = _kernel32.CloseHandle
+    _CloseHandle.argtypes = [wintypes.HANDLE]
+    _CloseHandle.restype = wintypes.BOOL
+
+    # Undocumented win32u export behind EnumWindows (Windows 10+); returns all
+    # top-level handles in one call instead of one Python callback per window
+    STATUS_BUFFER_TOO_SMALL = 0xC0000023
+    try:
+        _NtUserBuildHwndList = ctypes.WinDLL("win32u").NtUserBuildHwndList
+        _NtUserBuildHwndList.argtypes = [
+            wintypes.HANDLE,              # desktop (NULL = current)
+            wintypes.HWND,                # parent (NULL = top-level)
+            wintypes.BOOL,                # include children
+            wintypes.BOOL,                # exclude immersive windows
+            wintypes.DWORD,               # thread id (0 = all)
+            wintypes.UINT,                # buffer capacity in handles
+            ctypes.POINTER(wintypes.HWND),
+            ctypes.POINTER(wintypes.UINT),
+        ]
+        _NtUserBuildHwndList.restype = ctypes.c_long
+    except (OSError, AttributeError):
+        _NtUserBuildHwndList = None
+
+
+# Window handles found so far in this process, keyed by workdir
+_WINDOW_CACHE: Dict[Optional[str], int] = {}
+
 
 class WindowFinder:
     """Find Claude Code window using multiple strategies"""
@@ -178,25 +405,33 @@ class WindowFinder:
         "设置"
     ]
 
+    # Case-insensitive alternations of the patterns above, matched in one pass
+    _CLAUDE_RE = re.compile('|'.join(map(re.escape, CLAUDE_TITLE_PATTERNS)), re.IGNORECASE)
+    _EXCLUDE_RE = re.compile('|'.join(map(re.escape, NON_TERMINAL_PATTERNS)), re.IGNORECASE)
+
+    # Terminal host process names (lowercase)
+    TERMINAL_PROCESS_NAMES = frozenset({
+        "windowsterminal.exe",
+        "openconsole.exe",  # Windows Console Host
+        "conhost.exe",
+    })
+
     @staticmethod
     def is_claude_window(hwnd: int, title: str, workdir: Optional[str] = None) -> bool:
         """Check if window matches Claude Code criteria"""
         if not title or not title.strip():
             return False
 
-        title_lower = title.lower()
-
         # Exclude non-terminal windows
-        for pattern in WindowFinder.NON_TERMINAL_PATTERNS:
-            if pattern.lower() in title_lower:
-                return False
+        if WindowFinder._EXCLUDE_RE.search(title):
+            return False
 
         # Must contain a Claude-related pattern
-        has_claude_pattern = any(pattern.lower() in title_lower for pattern in WindowFinder.CLAUDE_TITLE_PATTERNS)
-
-        if not has_claude_pattern:
+        if not WindowFinder._CLAUDE_RE.search(title):
             return False
 
+        title_lower = title.lower()
+
         # If workdir provided, check if it contains relevant parts
         if workdir:
             # Extract project name from workdir
@@ -209,81 +444,56 @@ class WindowFinder:
         return True
 
     @staticmethod
-    def find_by_title(workdir: Optional[str] = None) -> Optional[int]:
+    def find_by_title(workdir: Optional[str] = None,
+                      windows: Optional[Tuple[array, array, List[str]]] = None,
+                      pid_names: Optional[Dict[int, str]] = None) -> Optional[int]:
         """Find Claude Code window by title matching"""
         if not WINDOWS_AVAILABLE:
             return None
 
-        # Strategy 1: Find windows by terminal process names (WindowsTerminal.exe, etc.)
-        def find_terminal_by_process():
-            terminal_process_names = [
-                "WindowsTerminal.exe",
-                "OpenConsole.exe",  # Windows Console Host
-                "conhost.exe",
-            ]
-
-            def callback(hwnd, windows):
-                try:
-                    if win32gui.IsWindowVisible(hwnd):
-                        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                        try:
-                            process = psutil.Process(pid)
-                            if process.name() in terminal_process_names:
-                                title = win32gui.GetWindowText(hwnd)
-                                windows.append((hwnd, title, pid))
-                        except (psutil.NoSuchProcess, psutil.AccessDenied):
-                            pass
-                except:
-                    pass
-                return True
-
-            windows = []
-            win32gui.EnumWindows(callback, windows)
-            return windows
+        if windows is None:
+            windows = WindowFinder._enum_all_visible_windows()
+        hwnds, pids, titles = windows
 
-        # Try process-based detection first
-        terminal_windows = find_terminal_by_process()
-        if terminal_windows:
-            logger.info(f"Found {len(terminal_windows)} terminal window(s) by process")
+        # Strategy 1: Find windows by terminal process names (WindowsTerminal.exe, etc.)
+        # One process snapshot instead of opening every window's process
+        if pid_names is None:
+            pid_names = WindowFinder._snapshot_pid_names()
+        terminal_windows = (
+            (hwnd, title, pid) for hwnd, pid, title in zip(hwnds, pids, titles)
+            if pid_names.get(pid, "").lower() in WindowFinder.TERMINAL_PROCESS_NAMES
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            # Only list every match when it will be logged
+            terminal_windows = list(terminal_windows)
+            logger.debug("Found %d terminal window(s) by process", len(terminal_windows))
             for hwnd, title, pid in terminal_windows:
-                logger.info(f"  - HWND: {hwnd}, PID: {pid}, Title: {title}")
+                logger.debug("  - HWND: %s, PID: %s, Title: %s", hwnd, pid, title)
+            terminal_windows = iter(terminal_windows)
 
-            # Return first match (Windows Terminal)
-            first_hwnd = terminal_windows[0][0]
-            logger.info(f"Returning window HWND: {first_hwnd}")
-            return first_hwnd
+        # Return first match (Windows Terminal)
+        first_match = next(terminal_windows, None)
+        if first_match:
+            logger.info(f"Found terminal window by process, returning HWND: {first_match[0]}")
+            return first_match[0]
 
         # Strategy 2: Fallback to title-based detection
-        def find_terminal_by_title():
-            def callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    if title:
-                        title_lower = title.lower()
-                        # Check if it's a Windows Terminal or other terminal
-                        is_terminal = any(pattern.lower() in title_lower for pattern in WindowFinder.CLAUDE_TITLE_PATTERNS)
-                        # Exclude non-terminal windows
-                        is_excluded = any(pattern.lower() in title_lower for pattern in WindowFinder.NON_TERMINAL_PATTERNS)
-                        if is_terminal and not is_excluded:
-                            windows.append((hwnd, title))
-                return True
-
-            windows = []
-            win32gui.EnumWindows(callback, windows)
-            return windows
-
-        terminal_windows = find_terminal_by_title()
+        # Must look like a terminal and not match an excluded window
+        terminal_windows = [
+            (hwnd, title) for hwnd, title in zip(hwnds, titles)
+            if title and WindowFinder._CLAUDE_RE.search(title)
+            and not WindowFinder._EXCLUDE_RE.search(title)
+        ]
         if terminal_windows:
             # If workdir provided, try to match by path components
             if workdir:
+                parts = [part.lower() for part in reversed(Path(workdir).parts) if len(part) > 3]
                 for hwnd, title in terminal_windows:
                     title_lower = title.lower()
                     # Check if title contains any part of the workdir
-                    parts = Path(workdir).parts
-                    for part in reversed(parts):
-                        if len(part) > 3 and part.lower() in title_lower:
-                            logger.info(f"Found terminal window by path match: {title}")
-                            return hwnd
+                    if any(part in title_lower for part in parts):
+                        logger.info(f"Found terminal window by path match: {title}")
+                        return hwnd
 
             # Return first terminal window as fallback (most likely the active one)
             logger.info(f"Using terminal window: {terminal_windows[0][1]}")
@@ -293,37 +503,43 @@ class WindowFinder:
         return None
 
     @staticmethod
-    def find_by_process_tree() -> Optional[int]:
-        """Find Claude Code window by traversing process tree"""
+    def find_by_process_tree(windows: Optional[Tuple[array, array, List[str]]] = None,
+                             parent_pid: Optional[int] = None,
+                             pid_names: Optional[Dict[int, str]] = None) -> Optional[int]:
+        """
+        Find Claude Code window by traversing process tree.
+
+        parent_pid starts the walk at that process instead of this one's parent,
+        which a detached process may have already outlived.
+        """
         if not WINDOWS_AVAILABLE:
             return None
 
         try:
-            # Get current process
-            current_process = psutil.Process()
-            logger.info(f"Current process: {current_process.name()} (PID: {current_process.pid})")
+            if windows is None:
+                windows = WindowFinder._enum_all_visible_windows()
 
-            # Walk up the process tree to find terminal parent
-            parent = current_process
-            seen_pids = set()
-
-            for i in range(10):  # Limit traversal depth
-                try:
-                    parent = parent.parent()
-                    if parent is None or parent.pid in seen_pids:
-                        break
-                    seen_pids.add(parent.pid)
+            # Get current process and all its ancestors in one pass
+            current_process = psutil.Process()
+            if pid_names is None:
+                pid_names = WindowFinder._snapshot_pid_names()
+            logger.info(f"Current process: {pid_names.get(current_process.pid)} (PID: {current_process.pid})")
 
-                    logger.info(f"Parent {i}: {parent.name()} (PID: {parent.pid})")
+            if parent_pid:
+                start = psutil.Process(parent_pid)
+                ancestors = [start, *start.parents()]
+            else:
+                ancestors = current_process.parents()
 
-                    # Check if this process has visible windows
-                    hwnd = WindowFinder._find_window_for_pid(parent.pid)
-                    if hwnd:
-                        logger.info(f"Found window via parent PID {parent.pid}")
-                        return hwnd
+            # Walk up the process tree to find terminal parent
+            for i, parent in enumerate(ancestors[:10]):  # Limit traversal depth
+                logger.debug("Parent %d: %s (PID: %s)", i, pid_names.get(parent.pid), parent.pid)
 
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    break
+                # Check if this process has visible windows
+                hwnd = WindowFinder._find_window_for_pid(parent.pid, windows)
+                if hwnd:
+                    logger.info(f"Found window via parent PID {parent.pid}")
+                    return hwnd
 
             logger.info("No window found via process tree traversal (expected for hook calls)")
             return None
@@ -333,43 +549,133 @@ class WindowFinder:
             return None
 
     @staticmethod
-    def _find_window_for_pid(pid: int) -> Optional[int]:
-        """Find main window for given process ID"""
-        def callback(hwnd, result):
+    def _enum_all_visible_windows() -> Tuple[array, array, List[str]]:
+        """
+        Snapshot candidate top-level windows in a single pass.
+
+        Only visible, titled, unowned windows that are not tool windows are kept.
+
+        Returns:
+            tuple: (hwnds, pids, titles) as parallel columns
+        """
+        hwnds = array('q')
+        pids = array('L')
+        titles = []
+
+        for hwnd in WindowFinder._list_top_level_windows():
             try:
-                _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                if window_pid == pid and win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    if title:  # Has a title
-                        # Exclude non-terminal windows
-                        title_lower = title.lower()
-                        is_non_terminal = any(
-                            pattern.lower() in title_lower
-                            for pattern in WindowFinder.NON_TERMINAL_PATTERNS
-                        )
-                        if not is_non_terminal:
-                            result.append((hwnd, title))
+                if not win32gui.IsWindowVisible(hwnd):
+                    continue
+                # Cheap checks first: tool windows, owned windows and untitled
+                # windows are never candidates, so skip the GetWindowText copy
+                if win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE) & win32con.WS_EX_TOOLWINDOW:
+                    continue
+                if win32gui.GetWindow(hwnd, win32con.GW_OWNER):
+                    continue
+                if win32gui.GetWindowTextLength(hwnd) == 0:
+                    continue
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                title = win32gui.GetWindowText(hwnd)
+                hwnds.append(hwnd)
+                pids.append(pid)
+                titles.append(title)
             except:
                 pass
+
+        return hwnds, pids, titles
+
+    @staticmethod
+    def _list_top_level_windows() -> List[int]:
+        """
+        List all top-level window handles in Z-order.
+
+        Uses a single NtUserBuildHwndList call where available and falls back
+        to EnumWindows otherwise.
+        """
+        if _NtUserBuildHwndList is not None:
+            capacity = 1024
+            for _ in range(3):
+                buffer = (wintypes.HWND * capacity)()
+                needed = wintypes.UINT(0)
+                status = _NtUserBuildHwndList(
+                    None, None, False, True, 0, capacity, buffer, ctypes.byref(needed)
+                ) & 0xFFFFFFFF
+                if status == 0:
+                    count = min(needed.value, capacity)
+                    # Skip empty slots and the list terminator
+                    return [hwnd for hwnd in buffer[:count] if hwnd and hwnd != 1]
+                if status != STATUS_BUFFER_TOO_SMALL:
+                    break
+                capacity = max(needed.value, capacity * 2)
+            logger.debug(f"NtUserBuildHwndList failed (status 0x{status:08X}), using EnumWindows")
+
+        hwnds = []
+
+        def callback(hwnd, _):
+            hwnds.append(hwnd)
             return True
 
-        windows = []
-        win32gui.EnumWindows(callback, windows)
+        win32gui.EnumWindows(callback, None)
+        return hwnds
 
-        if windows:
-            # Return the window with the largest area (main window)
-            windows_with_area = []
-            for hwnd, title in windows:
-                try:
-                    rect = win32gui.GetWindowRect(hwnd)
-                    area = (rect[2] - rect[0]) * (rect[3] - rect[1])
-                    windows_with_area.append((area, hwnd, title))
-                except:
-                    windows_with_area.append((0, hwnd, title))
+    @staticmethod
+    def _snapshot_pid_names() -> Dict[int, str]:
+        """Map PID to executable name using a single Toolhelp32 snapshot"""
+        try:
+            snapshot = _CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+            if not snapshot or snapshot == INVALID_HANDLE_VALUE:
+                raise ctypes.WinError()
+
+            pid_names = {}
+            try:
+                entry = PROCESSENTRY32W()
+                entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+                ok = _Process32FirstW(snapshot, ctypes.byref(entry))
+                while ok:
+                    pid_names[entry.th32ProcessID] = entry.szExeFile
+                    ok = _Process32NextW(snapshot, ctypes.byref(entry))
+            finally:
+                _CloseHandle(snapshot)
+            return pid_names
+
+        except Exception as e:
+            logger.debug(f"Process snapshot failed, falling back to psutil: {e}")
+            pid_names = {}
+            for process in psutil.process_iter(['pid', 'name']):
+                name = process.info.get('name')
+                if name:
+                    pid_names[process.info['pid']] = name
+            return pid_names
+
+    @staticmethod
+    def _find_window_for_pid(pid: int,
+                             windows: Optional[Tuple[array, array, List[str]]] = None) -> Optional[int]:
+        """Find main window for given process ID"""
+        if windows is None:
+            windows = WindowFinder._enum_all_visible_windows()
+        hwnds, pids, titles = windows
+
+        # Track the window with the largest area (main window)
+        best_area, best_hwnd, best_title = 0, None, None
+        for i, window_pid in enumerate(pids):
+            if window_pid != pid:
+                continue
+            title = titles[i]
+            # Has a title and is not a non-terminal window
+            if not title or WindowFinder._EXCLUDE_RE.search(title):
+                continue
+            hwnd = hwnds[i]
+            try:
+                rect = win32gui.GetWindowRect(hwnd)
+                area = (rect[2] - rect[0]) * (rect[3] - rect[1])
+            except:
+                area = 0
+            if best_hwnd is None or area > best_area:
+                best_area, best_hwnd, best_title = area, hwnd, title
 
-            windows_with_area.sort(reverse=True)
-            logger.info(f"Found window for PID {pid}: {windows_with_area[0][2]}")
-            return windows_with_area[0][1]
+        if best_hwnd is not None:
+            logger.info(f"Found window for PID {pid}: {best_title}")
+            return best_hwnd
 
         return None
 
@@ -380,16 +686,8 @@ class WindowFinder:
             return None
 
         try:
-            import ctypes
-            from ctypes import wintypes
-
             # GetConsoleWindow returns the handle to the console window
-            kernel32 = ctypes.windll.kernel32
-            get_console_window = kernel32.GetConsoleWindow
-            get_console_window.argtypes = []
-            get_console_window.restype = wintypes.HWND
-
-            hwnd = get_console_window()
+            hwnd = _GetConsoleWindow()
             if hwnd:
                 logger.info(f"Found console window: {hwnd}")
                 return hwnd
@@ -400,15 +698,35 @@ class WindowFinder:
         return None
 
     @classmethod
-    def find_window(cls, workdir: Optional[str] = None) -> Optional[int]:
+    def find_window(cls, workdir: Optional[str] = None, console_hwnd: Optional[int] = None,
+                    parent_pid: Optional[int] = None) -> Optional[int]:
+        """
+        Find Claude Code window, reusing an earlier result while it is still valid.
+
+        console_hwnd and parent_pid stand in for this process's own console and
+        parent when it runs detached from the hook that launched it.
+        """
+        hwnd = _WINDOW_CACHE.get(workdir)
+        if hwnd and win32gui.IsWindow(hwnd):
+            logger.info(f"Using cached window: {hwnd}")
+            return hwnd
+
+        hwnd = cls._search_window(workdir, console_hwnd, parent_pid)
+        if hwnd:
+            _WINDOW_CACHE[workdir] = hwnd
+        return hwnd
+
+    @classmethod
+    def _search_window(cls, workdir: Optional[str] = None, console_hwnd: Optional[int] = None,
+                       parent_pid: Optional[int] = None) -> Optional[int]:
         """Find Claude Code window using all available strategies"""
         logger.info("=== Starting window search ===")
 
         # CRITICAL: Skip get_console_window() for hook calls
         # Hook processes have their own hidden console window, not the visible terminal
         # Check if we're being called from a hook by examining the console window title
-        hwnd = cls.get_console_window()
-        if hwnd:
+        hwnd = (console_hwnd if WINDOWS_AVAILABLE else None) or cls.get_console_window()
+        if hwnd and win32gui.IsWindow(hwnd):
             title = win32gui.GetWindowText(hwnd)
             logger.info(f"get_console_window found: HWND={hwnd}, Title='{title}'")
             # Only use console window if it has a title (visible window)
@@ -418,15 +736,21 @@ class WindowFinder:
             else:
                 logger.info("Console window has no title, likely hidden hook window - skipping")
 
+        # One window and one process snapshot shared by every strategy below
+        windows = pid_names = None
+        if WINDOWS_AVAILABLE:
+            windows = cls._enum_all_visible_windows()
+            pid_names = cls._snapshot_pid_names()
+
         # Try process tree traversal
-        hwnd = cls.find_by_process_tree()
+        hwnd = cls.find_by_process_tree(windows, parent_pid, pid_names)
         if hwnd:
             logger.info(f"Found via process tree: {hwnd}")
             return hwnd
 
         # Fall back to title matching (most reliable for hook calls)
         logger.info("Falling back to title-based search")
-        hwnd = cls.find_by_title(workdir)
+        hwnd = cls.find_by_title(workdir, windows, pid_names)
         if hwnd:
             logger.info(f"Found via title search: {hwnd}")
         else:
@@ -459,26 +783,28 @@ class WindowHighlighter:
     @staticmethod
     def flash_ex(hwnd: int, count: int = 5, timeout: int = 500) -> bool:
         """Flash window using FlashWindowEx API with enhanced visibility"""
-        if not WINDOWS_AVAILABLE:
+        deadline = WindowHighlighter.flash_ex_start(hwnd, count, timeout)
+        if deadline is None:
             return False
+        WindowHighlighter.flash_ex_wait(deadline)
+        return True
 
-        try:
-            import ctypes
-            from ctypes import wintypes
+    @staticmethod
+    def flash_ex_start(hwnd: int, count: int = 5, timeout: int = 500) -> Optional[float]:
+        """
+        Start flashing window with FlashWindowEx without waiting for it.
 
+        Returns:
+            Monotonic time at which the flash completes, or None on failure
+        """
+        if not WINDOWS_AVAILABLE:
+            return None
+
+        try:
             # Verify window is still valid
             if not win32gui.IsWindow(hwnd):
                 logger.error(f"Window handle {hwnd} is no longer valid!")
-                return False
-
-            class FLASHWINFO(ctypes.Structure):
-                _fields_ = [
-                    ("cbSize", wintypes.UINT),
-                    ("hwnd", wintypes.HWND),
-                    ("dwFlags", wintypes.DWORD),
-                    ("uCount", wintypes.UINT),
-                    ("dwTimeout", wintypes.DWORD),
-                ]
+                return None
 
             info = FLASHWINFO()
             info.cbSize = ctypes.sizeof(FLASHWINFO)
@@ -493,23 +819,27 @@ class WindowHighlighter:
 
             logger.info(f"Calling FlashWindowEx: hwnd={hwnd}, count={count}, timeout={timeout}")
 
-            user32 = ctypes.windll.user32
-            result = user32.FlashWindowEx(ctypes.byref(info))
+            result = _FlashWindowEx(ctypes.byref(info))
 
             logger.info(f"FlashWindowEx returned: {result}")
 
-            # IMPORTANT: Wait for flash to complete
-            # FlashWindowEx is async - if we exit immediately, the effect gets cancelled
+            # FlashWindowEx is async - if we exit before it finishes, the effect gets cancelled
             # Total time = count * (timeout + timeout) = count * 2 * timeout ms
-            total_wait_time = count * 2 * timeout / 1000
-            logger.info(f"Waiting {total_wait_time:.1f}s for flash to complete")
-            time.sleep(total_wait_time)
-
-            return True
+            return time.monotonic() + count * 2 * timeout / 1000
 
         except Exception as e:
             logger.warning(f"FlashWindowEx failed, falling back to basic flash: {e}")
-            return WindowHighlighter.flash(hwnd, count, timeout)
+            if WindowHighlighter.flash(hwnd, count, timeout):
+                return time.monotonic()
+            return None
+
+    @staticmethod
+    def flash_ex_wait(deadline: float) -> None:
+        """Block until a flash started by flash_ex_start has completed"""
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            logger.info(f"Waiting {remaining:.1f}s for flash to complete")
+            time.sleep(remaining)
 
     @staticmethod
     def bring_to_front(hwnd: int) -> bool:
@@ -562,7 +892,23 @@ class WindowHighlighter:
     @classmethod
     def highlight(cls, hwnd: int, mode: HighlightMode, flash_count: int = 5) -> bool:
         """Apply window highlighting based on mode"""
+        success, flash_deadline = cls.start_highlight(hwnd, mode, flash_count)
+        if flash_deadline is not None:
+            cls.flash_ex_wait(flash_deadline)
+        return success
+
+    @classmethod
+    def start_highlight(cls, hwnd: int, mode: HighlightMode,
+                        flash_count: int = 5) -> Tuple[bool, Optional[float]]:
+        """
+        Apply window highlighting without waiting for a flash to finish.
+
+        Returns:
+            tuple: (success, flash_deadline) - pass flash_deadline to
+            flash_ex_wait before exiting so the flash is not cancelled
+        """
         success = False
+        flash_deadline = None
 
         logger.info(f"Applying highlight mode: {mode.value}, flash_count: {flash_count}, hwnd: {hwnd}")
 
@@ -570,7 +916,8 @@ class WindowHighlighter:
             success = cls.bring_to_front(hwnd)
             logger.info(f"Bring to front result: {success}")
         elif mode == HighlightMode.FLASH:
-            success = cls.flash_ex(hwnd, flash_count)
+            flash_deadline = cls.flash_ex_start(hwnd, flash_count)
+            success = flash_deadline is not None
             logger.info(f"Flash result: {success}")
         elif mode == HighlightMode.TOPMOST:
             success = cls.set_topmost(hwnd, True)
@@ -583,15 +930,32 @@ class WindowHighlighter:
         elif mode == HighlightMode.ALL:
             cls.bring_to_front(hwnd)
             time.sleep(0.1)
-            success = cls.flash_ex(hwnd, flash_count)
+            flash_deadline = cls.flash_ex_start(hwnd, flash_count)
+            success = flash_deadline is not None
             logger.info(f"ALL mode result: {success}")
 
-        return success
+        return success, flash_deadline
+
+
+# Decoded pygame sounds keyed by file path
+_SOUND_CACHE: Dict[str, "pygame.mixer.Sound"] = {}
+
+# Decoded float32 samples and sample rate keyed by file path
+_SAMPLE_CACHE: Dict[str, Tuple["numpy.ndarray", int]] = {}
 
 
 class SoundPlayer:
     """Play notification sounds"""
 
+    # Map event types to sound files
+    SOUND_FILES = {
+        "stop": "complete.mp3",
+        "tool_complete": "tool_complete.mp3",
+        "permission": "permission.mp3",
+        "error": "error.mp3",
+    }
+    FALLBACK_SOUND = "notice.mp3"
+
     def __init__(self, mp3_dir: Optional[Path] = None):
         if mp3_dir:
             self.mp3_dir = mp3_dir
@@ -599,44 +963,75 @@ class SoundPlayer:
             script_dir = Path(__file__).parent
             self.mp3_dir = script_dir.parent / "mp3"
 
+        # Resolve every event's sound from one directory listing
+        try:
+            available = {path.name for path in self.mp3_dir.iterdir()}
+        except OSError:
+            available = set()
+        fallback = self.mp3_dir / self.FALLBACK_SOUND if self.FALLBACK_SOUND in available else None
+        self._fallback_path = fallback
+        self._event_paths: Dict[str, Optional[Path]] = {
+            event_type: self.mp3_dir / filename if filename in available else fallback
+            for event_type, filename in self.SOUND_FILES.items()
+        }
+
     def get_sound_path(self, event_type: str, custom_path: Optional[str] = None) -> Optional[Path]:
         """Get sound file path for event type"""
         if custom_path:
             return Path(custom_path)
 
-        # Map event types to sound files
-        sound_files = {
-            "stop": "complete.mp3",
-            "tool_complete": "tool_complete.mp3",
-            "permission": "permission.mp3",
-            "error": "error.mp3",
-        }
-
-        filename = sound_files.get(event_type, "notice.mp3")
-        sound_path = self.mp3_dir / filename
+        sound_path = self._event_paths.get(event_type, self._fallback_path)
+        if sound_path is None:
+            filename = self.SOUND_FILES.get(event_type, self.FALLBACK_SOUND)
+            logger.warning(f"Sound file not found: {self.mp3_dir / filename}")
+        return sound_path
 
-        if sound_path.exists():
-            return sound_path
+    @staticmethod
+    def load_sound(sound_path: Path) -> "pygame.mixer.Sound":
+        """Load a pygame sound, decoding each file only once per process"""
+        key = str(sound_path)
+        sound = _SOUND_CACHE.get(key)
+        if sound is None:
+            sound = _SOUND_CACHE.setdefault(key, pygame.mixer.Sound(key))
+        return sound
 
-        # Fallback to notice.mp3
-        fallback = self.mp3_dir / "notice.mp3"
-        if fallback.exists():
-            return fallback
+    @staticmethod
+    def load_samples(sound_path: Path) -> Tuple["numpy.ndarray", int]:
+        """Decode a sound file to float32 samples, once per process"""
+        key = str(sound_path)
+        samples = _SAMPLE_CACHE.get(key)
+        if samples is None:
+            data, samplerate = sf.read(key, dtype='float32', always_2d=True)
+            samples = _SAMPLE_CACHE.setdefault(key, (data, samplerate))
+        return samples
 
-        logger.warning(f"Sound file not found: {sound_path}")
-        return None
+    @staticmethod
+    def play_stream(sound_path: Path, block_frames: int = 4096) -> None:
+        """Play sound through a blocking sounddevice stream"""
+        data, samplerate = SoundPlayer.load_samples(sound_path)
+        # write() blocks in PortAudio until each block is queued;
+        # leaving the context stops the stream once it has drained
+        with sd.OutputStream(samplerate=samplerate, channels=data.shape[1],
+                             dtype='float32', blocksize=2048, latency='high') as stream:
+            for start in range(0, len(data), block_frames):
+                stream.write(data[start:start + block_frames])
 
     def play_async(self, sound_path: Path) -> threading.Thread:
         """Play sound in background thread"""
         def play():
             try:
-                if USE_PYGAME:
+                if USE_SOUNDDEVICE:
+                    self.play_stream(sound_path)
+                elif USE_PYGAME:
                     # Use pygame for more reliable playback
-                    sound = pygame.mixer.Sound(str(sound_path))
-                    sound.play()
-                    # Wait for sound to finish
-                    while pygame.mixer.get_busy():
-                        time.sleep(0.1)
+                    sound = self.load_sound(sound_path)
+                    # play() returns None when no mixer channel was free
+                    channel = sound.play()
+                    if channel is not None:
+                        # Wait for sound to finish with a single sleep (small margin for mixer latency).
+                        # Channel end events would need the SDL event loop, which this
+                        # background thread does not run
+                        time.sleep(sound.get_length() + 0.05)
                 elif playsound is not None:
                     playsound(str(sound_path), block=True)
                 else:
@@ -659,18 +1054,19 @@ class SoundPlayer:
         except:
             print("\a")  # Terminal bell
 
-    def play(self, event_type: str, custom_path: Optional[str] = None) -> None:
-        """Play notification sound for event"""
+    def play(self, event_type: str, custom_path: Optional[str] = None) -> Optional[threading.Thread]:
+        """Play notification sound for event, returning the playback thread if any"""
         if not WINDOWS_AVAILABLE:
-            return
+            return None
 
         sound_path = self.get_sound_path(event_type, custom_path)
         if sound_path:
             logger.info(f"Playing sound: {sound_path.name}")
-            self.play_async(sound_path)
-        else:
-            logger.debug("Using system beep as fallback")
-            self.play_beep()
+            return self.play_async(sound_path)
+
+        logger.debug("Using system beep as fallback")
+        self.play_beep()
+        return None
 
 
 class NotificationManager:
@@ -679,7 +1075,8 @@ class NotificationManager:
     def __init__(self, event_type: str, workdir: Optional[str] = None,
                  highlight_mode: str = "flash", flash_count: int = 5,
                  custom_sound: Optional[str] = None,
-                 no_sound: bool = False, no_highlight: bool = False):
+                 no_sound: bool = False, no_highlight: bool = False,
+                 console_hwnd: Optional[int] = None, parent_pid: Optional[int] = None):
         self.event_type = event_type
         self.workdir = workdir
         self.highlight_mode_str = highlight_mode
@@ -687,6 +1084,8 @@ class NotificationManager:
         self.custom_sound = custom_sound
         self.no_sound = no_sound
         self.no_highlight = no_highlight
+        self.console_hwnd = console_hwnd
+        self.parent_pid = parent_pid
 
         # Initialize components
         self.config_manager = ConfigManager()
@@ -696,6 +1095,11 @@ class NotificationManager:
 
     def execute(self) -> int:
         """Execute notification based on configuration"""
+        # Nothing to do when the command line disables both outputs
+        if self.no_sound and self.no_highlight:
+            logger.info("Both sound and highlight disabled by flags")
+            return 0
+
         # Load configuration
         config = self.config_manager.get_event_config(self.event_type)
 
@@ -719,7 +1123,7 @@ class NotificationManager:
             highlight_mode = HighlightMode(config.highlight_mode)
 
         # Find window
-        hwnd = self.window_finder.find_window(self.workdir)
+        hwnd = self.window_finder.find_window(self.workdir, self.console_hwnd, self.parent_pid)
         if not hwnd:
             logger.warning("Could not find Claude Code window")
             # Still play sound if enabled
@@ -741,7 +1145,7 @@ class NotificationManager:
 
         logger.info(f"Executing notification for event: {self.event_type}")
 
-        # Play sound and save thread
+        # Start sound first so a slow highlight never delays it
         sound_thread = None
         if sound_enabled:
             if self.custom_sound:
@@ -749,12 +1153,12 @@ class NotificationManager:
             else:
                 sound_thread = self.sound_player.play(self.event_type)
 
-        # Highlight window
+        # Start highlight; the flash animates while the sound plays
+        flash_deadline = None
         if highlight_enabled:
             flash_count = self.flash_count
             logger.info(f"Starting window highlight: mode={highlight_mode.value}, flash_count={flash_count}")
-            self.window_highlighter.highlight(hwnd, highlight_mode, flash_count)
-            logger.info("Window highlight completed")
+            _, flash_deadline = self.window_highlighter.start_highlight(hwnd, highlight_mode, flash_count)
 
         # Wait for sound to finish (with timeout to prevent hanging)
         if sound_thread and sound_enabled:
@@ -762,42 +1166,17 @@ class NotificationManager:
             sound_thread.join(timeout=10)
             logger.info("Sound playback completed")
 
-        return 0
+        # Keep the process alive until the flash has finished
+        if flash_deadline is not None:
+            self.window_highlighter.flash_ex_wait(flash_deadline)
+        logger.info("Window highlight completed")
 
+        return 0
 
-def main():
-    parser = argparse.ArgumentParser(
-        description='Claude Code Notification System',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  %(prog)s --event stop
-  %(prog)s --event tool_complete --tool-name "Bash"
-  %(prog)s --event permission --highlight-mode focus
-  %(prog)s --event stop --highlight-mode all --flash-count 5
-        """
-    )
-
-    parser.add_argument('--event', required=True,
-                        choices=['stop', 'tool_complete', 'permission', 'error'],
-                        help='Event type triggering the notification')
-    parser.add_argument('--tool-name', default='',
-                        help='Name of the tool (for tool_complete event)')
-    parser.add_argument('--workdir',
-                        help='Working directory for window matching')
-    parser.add_argument('--highlight-mode', default='flash',
-                        choices=['flash', 'topmost', 'focus', 'all'],
-                        help='Window highlight mode')
-    parser.add_argument('--flash-count', type=int, default=5,
-                        help='Number of flash iterations (default: 5)')
-    parser.add_argument('--sound',
-                        help='Custom sound file path')
-    parser.add_argument('--no-sound', action='store_true',
-                        help='Disable sound for this notification')
-    parser.add_argument('--no-highlight', action='store_true',
-                        help='Disable window highlight for this notification')
 
-    args = parser.parse_args()
+def main(args: Optional[argparse.Namespace] = None):
+    if args is None:
+        args = build_parser().parse_args()
 
     # Create and execute notification
     manager = NotificationManager(
@@ -807,11 +1186,13 @@ Examples:
         flash_count=args.flash_count,
         custom_sound=args.sound,
         no_sound=args.no_sound,
-        no_highlight=args.no_highlight
+        no_highlight=args.no_highlight,
+        console_hwnd=args.hwnd,
+        parent_pid=args.parent_pid
     )
 
     return manager.execute()
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main(_ARGS))
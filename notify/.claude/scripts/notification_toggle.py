@@ -13,16 +13,154 @@ Usage:
     python notification_toggle.py --no-highlight [--global]
 """
 
-import json
-import argparse
 import sys
+from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+
+# Config locations cannot change during a process lifetime
+_SCRIPT_DIR = Path(__file__).parent
+# Project config: .claude/notification_config.json (relative to script)
+_PROJECT_CONFIG_PATH = _SCRIPT_DIR.parent / "notification_config.json"
+# Global config path, filled in by _global_config_path on first use
+_global_config_path_cache = None
+
+
+def _global_config_path() -> Path:
+    """Return the global config path: ~/.claude/notification_config.json"""
+    global _global_config_path_cache
+    if _global_config_path_cache is None:
+        _global_config_path_cache = Path.home() / ".claude" / "notification_config.json"
+    return _global_config_path_cache
+
+
+def _json_loads(data: bytes):
+    """Parse UTF-8 JSON bytes"""
+    import json
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes"""
+    import json
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _read_json_if_exists(path: Path):
+    """
+    Load a JSON config file.
+
+    Returns:
+        tuple: (found, config), where found is False only if the file does not
+        exist and config is None if it is missing or invalid
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return False, None
+    except OSError as e:
+        print(f"Warning: Failed to load config: {e}", file=sys.stderr)
+        return True, None
+
+    try:
+        return True, _json_loads(data)
+    except ValueError as e:
+        print(f"Warning: Failed to load config: {e}", file=sys.stderr)
+        return True, None
+
+
+def _freeze(value):
+    """Return a read-only view of a nested dict"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _thaw(value):
+    """Return a mutable deep copy of a (possibly read-only) nested mapping"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+# Command-line flags mapped to their attribute names on the parsed args
+_FLAGS = {
+    "--enable": "enable",
+    "--disable": "disable",
+    "--no-sound": "no_sound",
+    "--no-highlight": "no_highlight",
+    "--status": "status",
+    "--global": "use_global",
+    "--project": "use_project",
+}
+
+_SEPARATOR = "=" * 35
+_EVENT_ORDER = ("stop", "tool_complete", "permission", "error")
+_ICON_ON = "[+]"
+_ICON_OFF = "[ ]"
+_TEXT_ON = "Enabled"
+_TEXT_OFF = "Disabled"
+
+# Status display layout; optional sections are filled in as preformatted blocks
+_STATUS_TEMPLATE = """
+Claude Code Notification Status
+{separator}
+
+Configuration Files:
+{global_line}
+{project_line}
+
+  {status_icon} Notifications: {status_text}
+     (from: {source}){details_block}{note_block}
+"""
+
+_DETAILS_TEMPLATE = """
+  {sound_icon} Sound: {sound_text}
+     (from: {sound_source})
+  {highlight_icon} Window Highlight: {highlight_text}
+     (from: {highlight_source})"""
+
+_PROJECT_NOTE = """
+
+Note: Project config is overriding global settings.
+      Use 'disable --project' or delete the project config file to remove overrides."""
+
+
+# Directories already created by save_config in this process
+_CREATED_DIRS = set()
+
+
+def _ensure_dir_once(path: Path) -> None:
+    """Create path (and parents) unless this process already did so"""
+    if path not in _CREATED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+        _CREATED_DIRS.add(path)
+
+
+class EventConfig:
+    """Per-event notification settings"""
+
+    __slots__ = ("enabled", "sound", "highlight", "flash_count", "highlight_mode")
+
+    def __init__(self, enabled: bool = True, sound: bool = True, highlight: bool = True,
+                 flash_count: int = 5, highlight_mode: str = "flash"):
+        self.enabled = enabled
+        self.sound = sound
+        self.highlight = highlight
+        self.flash_count = flash_count
+        self.highlight_mode = highlight_mode
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EventConfig":
+        """Build from a config file entry, ignoring unknown keys"""
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
 
 
 class ConfigManager:
     """Manage notification configuration with global and project-level support"""
 
-    DEFAULT_CONFIG = {
+    # Read-only; use _thaw(DEFAULT_CONFIG) to get a copy that can be modified
+    DEFAULT_CONFIG = _freeze({
         "enabled": True,
         "sound_enabled": True,
         "highlight_enabled": True,
@@ -36,7 +174,7 @@ class ConfigManager:
             "error": {"enabled": True, "sound": True, "highlight": True,
                      "flash_count": 5, "highlight_mode": "flash"}
         }
-    }
+    })
 
     def __init__(self, use_global: bool = False):
         """
@@ -45,61 +183,54 @@ class ConfigManager:
         Args:
             use_global: If True, use global config path; otherwise use project config path
         """
-        script_dir = Path(__file__).parent
-
-        if use_global:
-            # Global config: ~/.claude/notification_config.json
-            home = Path.home()
-            self.config_path = home / ".claude" / "notification_config.json"
-        else:
-            # Project config: .claude/notification_config.json (relative to script)
-            self.config_path = script_dir.parent / "notification_config.json"
+        self.config_path = _global_config_path() if use_global else _PROJECT_CONFIG_PATH
 
     @staticmethod
     def get_config_paths():
         """Return tuple of (global_config_path, project_config_path) for status display"""
-        script_dir = Path(__file__).parent
-        global_path = Path.home() / ".claude" / "notification_config.json"
-        project_path = script_dir.parent / "notification_config.json"
-        return global_path, project_path
+        return _global_config_path(), _PROJECT_CONFIG_PATH
 
     def load_config(self) -> dict:
         """Load configuration from file, return None if not exists"""
-        if self.config_path.exists():
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Failed to load config: {e}", file=sys.stderr)
-                return None
-        return None
+        return _read_json_if_exists(self.config_path)[1]
 
     def save_config(self, config: dict) -> bool:
         """Save configuration to file"""
         try:
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            return True
-        except IOError as e:
+            payload = _json_dumps(config)
+        except TypeError as e:
             print(f"Error: Failed to save config to {self.config_path}: {e}", file=sys.stderr)
             return False
+        return self.save_config_bytes(payload)
 
-    @staticmethod
-    def merge_configs(base: dict, override: dict) -> dict:
-        """Deep merge override config into base config"""
-        result = base.copy()
+    def update_config(self, config: dict, updates: dict, force: bool = False) -> bool:
+        """Apply top-level updates and save, skipping the write if nothing changed"""
+        if not force and all(config.get(key) == value for key, value in updates.items()):
+            return True
+        config.update(updates)
+        return self.save_config(config)
 
-        if override:
-            for key, override_value in override.items():
-                base_value = result.get(key)
+    def save_config_bytes(self, payload: bytes) -> bool:
+        """Write already-serialized configuration to file"""
+        try:
+            _ensure_dir_once(self.config_path.parent)
+            self.config_path.write_bytes(payload)
+            return True
+        except OSError as e:
+            print(f"Error: Failed to save config to {self.config_path}: {e}", file=sys.stderr)
+            return False
 
-                if isinstance(base_value, dict) and isinstance(override_value, dict):
-                    result[key] = ConfigManager.merge_configs(base_value, override_value)
-                else:
-                    result[key] = override_value
+    @staticmethod
+    def _merge_into(base: dict, override: dict) -> None:
+        """Deep merge override config into base config, modifying base in place"""
+        for key, override_value in override.items():
+            base_value = base.get(key)
 
-        return result
+            if isinstance(base_value, dict) and isinstance(override_value, dict):
+                ConfigManager._merge_into(base_value, override_value)
+            else:
+                # Copy nested values so base never aliases the override
+                base[key] = _thaw(override_value)
 
     @staticmethod
     def get_merged_config() -> tuple:
@@ -107,29 +238,28 @@ class ConfigManager:
         Load and merge global and project configs.
 
         Returns:
-            tuple: (merged_config, global_config, project_config)
+            tuple: (merged_config, global_config, project_config, global_found,
+            project_found), where merged_config["events"] maps event names to
+            EventConfig and the found flags tell whether each file exists
         """
-        global_path, project_path = ConfigManager.get_config_paths()
-
-        # Load global config
-        global_manager = ConfigManager(use_global=True)
-        global_config = global_manager.load_config()
+        global_found, global_config = _read_json_if_exists(_global_config_path())
+        project_found, project_config = _read_json_if_exists(_PROJECT_CONFIG_PATH)
 
-        # Load project config
-        project_manager = ConfigManager(use_global=False)
-        project_config = project_manager.load_config()
-
-        # Start with default or global config
-        if global_config:
-            merged = global_config
-        else:
-            merged = ConfigManager.DEFAULT_CONFIG.copy()
+        # Start with a private copy of the global or default config
+        merged = _thaw(global_config or ConfigManager.DEFAULT_CONFIG)
 
         # Merge project config on top
         if project_config:
-            merged = ConfigManager.merge_configs(merged, project_config)
+            ConfigManager._merge_into(merged, project_config)
+
+        # Per-event settings of the merged result become EventConfig instances
+        events = merged.get('events')
+        if isinstance(events, dict):
+            for event_name, event_config in events.items():
+                if isinstance(event_config, dict):
+                    events[event_name] = EventConfig.from_dict(event_config)
 
-        return merged, global_config, project_config
+        return merged, global_config, project_config, global_found, project_found
 
     @staticmethod
     def get_config_source(key: str, global_config: dict, project_config: dict) -> str:
@@ -144,92 +274,74 @@ class ConfigManager:
     @staticmethod
     def get_status_display() -> str:
         """Get formatted status display with config sources"""
-        lines = []
-        lines.append("")
-        lines.append("Claude Code Notification Status")
-        lines.append("=" * 35)
-        lines.append("")
-
         global_path, project_path = ConfigManager.get_config_paths()
-        merged, global_config, project_config = ConfigManager.get_merged_config()
+        (merged, global_config, project_config,
+         global_found, project_found) = ConfigManager.get_merged_config()
 
         # Show configuration file status
-        lines.append("Configuration Files:")
-        if global_path.exists():
-            lines.append(f"  [+] Global: {global_path}")
+        if global_found:
+            global_line = f"  {_ICON_ON} Global: {global_path}"
         else:
-            lines.append(f"  [ ] Global: {global_path} (not found, using defaults)")
+            global_line = f"  {_ICON_OFF} Global: {global_path} (not found, using defaults)"
 
-        if project_path.exists():
-            lines.append(f"  [+] Project: {project_path}")
+        if project_found:
+            project_line = f"  {_ICON_ON} Project: {project_path}"
         else:
-            lines.append(f"  [ ] Project: {project_path} (not found)")
-
-        lines.append("")
+            project_line = f"  {_ICON_OFF} Project: {project_path} (not found)"
 
         # Get settings
         enabled = merged.get('enabled', True)
         sound_enabled = merged.get('sound_enabled', True)
         highlight_enabled = merged.get('highlight_enabled', True)
 
-        # Main status
-        status_icon = "[+]" if enabled else "[ ]"
-        source = ConfigManager.get_config_source('enabled', global_config, project_config)
-        status_text = "Enabled" if enabled else "Disabled"
-
-        lines.append(f"  {status_icon} Notifications: {status_text}")
-        lines.append(f"     (from: {source})")
-
+        details_block = ""
         if enabled:
-            # Sound status
-            sound_icon = "[+]" if sound_enabled else "[ ]"
             sound_source = ConfigManager.get_config_source('sound_enabled', global_config, project_config)
-            sound_text = "Enabled" if sound_enabled else "Disabled"
-
-            lines.append(f"  {sound_icon} Sound: {sound_text}")
-            lines.append(f"     (from: {sound_source})")
-
-            # Highlight status
-            highlight_icon = "[+]" if highlight_enabled else "[ ]"
             highlight_source = ConfigManager.get_config_source('highlight_enabled', global_config, project_config)
-            highlight_text = "Enabled" if highlight_enabled else "Disabled"
-
-            lines.append(f"  {highlight_icon} Window Highlight: {highlight_text}")
-            lines.append(f"     (from: {highlight_source})")
+            details_block = _DETAILS_TEMPLATE.format(
+                sound_icon=_ICON_ON if sound_enabled else _ICON_OFF,
+                sound_text=_TEXT_ON if sound_enabled else _TEXT_OFF,
+                sound_source=sound_source,
+                highlight_icon=_ICON_ON if highlight_enabled else _ICON_OFF,
+                highlight_text=_TEXT_ON if highlight_enabled else _TEXT_OFF,
+                highlight_source=highlight_source,
+            )
 
             # Event-specific settings
             events = merged.get('events', {})
             if events:
-                lines.append("")
-                lines.append("Event Settings:")
-                for event_name in ["stop", "tool_complete", "permission", "error"]:
+                event_lines = []
+                for event_name in _EVENT_ORDER:
                     if event_name in events:
                         event_config = events[event_name]
-                        event_enabled = event_config.get('enabled', True)
-                        event_icon = "[+]" if event_enabled else "[ ]"
-                        event_sound = event_config.get('sound', True)
-                        event_highlight = event_config.get('highlight', True)
+                        event_icon = _ICON_ON if event_config.enabled else _ICON_OFF
 
                         details = []
-                        if event_sound:
+                        if event_config.sound:
                             details.append("sound")
-                        if event_highlight:
+                        if event_config.highlight:
                             details.append("highlight")
                         details_str = ", ".join(details) if details else "none"
 
-                        lines.append(f"  {event_icon} {event_name}: {details_str}")
+                        event_lines.append(f"\n  {event_icon} {event_name}: {details_str}")
+                details_block += "\n\nEvent Settings:" + "".join(event_lines)
 
-        if project_config:
-            lines.append("")
-            lines.append("Note: Project config is overriding global settings.")
-            lines.append("      Use 'disable --project' or delete the project config file to remove overrides.")
+        return _STATUS_TEMPLATE.format_map({
+            "separator": _SEPARATOR,
+            "global_line": global_line,
+            "project_line": project_line,
+            "status_icon": _ICON_ON if enabled else _ICON_OFF,
+            "status_text": _TEXT_ON if enabled else _TEXT_OFF,
+            "source": ConfigManager.get_config_source('enabled', global_config, project_config),
+            "details_block": details_block,
+            "note_block": _PROJECT_NOTE if project_config else "",
+        })
 
-        lines.append("")
 
-        return "\n".join(lines)
+def _build_parser():
+    """Build the argparse parser, only needed for --help and usage errors"""
+    import argparse
 
-
-def main():
     parser = argparse.ArgumentParser(
         description='Control Claude Code notification settings',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -264,7 +376,23 @@ Configuration levels:
     parser.add_argument('--project', action='store_true', dest='use_project',
                         help='Explicitly operate on project config')
 
-    args = parser.parse_args()
+    return parser
+
+
+def _parse_args(argv):
+    """Parse the fixed boolean flag set without importing argparse"""
+    args = SimpleNamespace(**dict.fromkeys(_FLAGS.values(), False))
+    for arg in argv:
+        dest = _FLAGS.get(arg)
+        if dest is None:
+            # --help, unknown flags and abbreviations go through argparse
+            return _build_parser().parse_args(argv)
+        setattr(args, dest, True)
+    return args
+
+
+def main():
+    args = _parse_args(sys.argv[1:])
 
     # Determine which config to operate on
     # --global flag takes priority, --project is explicit (same as default)
@@ -279,17 +407,19 @@ Configuration levels:
         return 0
 
     # Load existing config or start with default
-    config = manager.load_config()
-    if config is None:
-        config = ConfigManager.DEFAULT_CONFIG.copy()
+    loaded = manager.load_config()
+    config = loaded if loaded is not None else _thaw(ConfigManager.DEFAULT_CONFIG)
+    # A missing or unreadable file is always rewritten
+    force = loaded is None
 
     # Handle enable
     if args.enable:
-        config["enabled"] = True
-        config["sound_enabled"] = True
-        config["highlight_enabled"] = True
-        if manager.save_config(config):
-            print(f"[+] {target_type} notifications enabled")
+        if manager.update_config(config, {
+            "enabled": True,
+            "sound_enabled": True,
+            "highlight_enabled": True,
+        }, force):
+            print(f"{_ICON_ON} {target_type} notifications enabled")
             print(f"    Config: {manager.config_path}")
             return 0
         else:
@@ -298,9 +428,8 @@ Configuration levels:
 
     # Handle disable
     elif args.disable:
-        config["enabled"] = False
-        if manager.save_config(config):
-            print(f"[ ] {target_type} notifications disabled")
+        if manager.update_config(config, {"enabled": False}, force):
+            print(f"{_ICON_OFF} {target_type} notifications disabled")
             print(f"    Config: {manager.config_path}")
             return 0
         else:
@@ -309,9 +438,8 @@ Configuration levels:
 
     # Handle no-sound
     elif args.no_sound:
-        config["sound_enabled"] = False
-        if manager.save_config(config):
-            print(f"[ ] {target_type} sound disabled (window highlight still active)")
+        if manager.update_config(config, {"sound_enabled": False}, force):
+            print(f"{_ICON_OFF} {target_type} sound disabled (window highlight still active)")
             print(f"    Config: {manager.config_path}")
             return 0
         else:
@@ -320,9 +448,8 @@ Configuration levels:
 
     # Handle no-highlight
     elif args.no_highlight:
-        config["highlight_enabled"] = False
-        if manager.save_config(config):
-            print(f"[ ] {target_type} window highlight disabled (sound still active)")
+        if manager.update_config(config, {"highlight_enabled": False}, force):
+            print(f"{_ICON_OFF} {target_type} window highlight disabled (sound still active)")
             print(f"    Config: {manager.config_path}")
             return 0
         else: